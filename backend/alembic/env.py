@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import inspect, text
+
+# DATABASE_URL comes from the shared settings (which load .env)
+from app.core.database import DATABASE_URL, Base, engine, register_models
+from app.core.indexes import HOT_PATH_INDEXES  # noqa: F401 (adds the indexes to Base.metadata for autogenerate)
+
+# Register models with SQLAlchemy
+register_models()
+
+config = context.config
+
+# Arbitrary key for the Postgres advisory lock that serializes concurrent upgrades
+MIGRATION_LOCK_ID = 7240131
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without a database connection"""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """Run migrations against the application's engine"""
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+
+        with context.begin_transaction():
+            # Workers started together with AUTO_MIGRATE queue here; the first applies
+            # the migrations and the rest find the database already at head
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+            # Empty database upgraded to head: build the current schema from the models and
+            # record it as head (Alembic's "building from scratch" recipe) instead of replaying
+            if context.get_revision_argument() in ("head", "heads") and not inspect(connection).get_table_names():
+                Base.metadata.create_all(connection)
+                context.get_context().stamp(context.script, "head")
+                return
+
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
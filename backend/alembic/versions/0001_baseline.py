@@ -0,0 +1,22 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14
+
+Adopts the schema main.py used to build with create_all on every start, as it
+exists in each deployment; nothing is created here. Fresh databases are built
+from the models and stamped at head by alembic/env.py instead of replaying
+migrations, so this revision never has to restate the tables.
+"""
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    pass
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,35 @@
+"""Hot-path composite indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14
+
+Adds the indexes from app/core/indexes.py as they stood at this revision
+(replaces create_indexes.py) to databases adopted by the 0001 baseline.
+if_not_exists skips them where create_all or create_indexes.py built them.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_analysis_user_created", "analyses",
+        ["user_id", "created_at"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_analysis_repo_status_created", "analyses",
+        ["repository_id", "status", "created_at"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_issue_analysis_sev_line", "code_issues",
+        ["analysis_id", "severity", "line_number"], if_not_exists=True
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_issue_analysis_sev_line", table_name="code_issues", if_exists=True)
+    op.drop_index("ix_analysis_repo_status_created", table_name="analyses", if_exists=True)
+    op.drop_index("ix_analysis_user_created", table_name="analyses", if_exists=True)
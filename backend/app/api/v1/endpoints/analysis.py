@@ -1,33 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import orjson
 
 from app.core.database import get_db
+from app.core.cache import cache_key, cached_response, invalidate
+from app.core.orjson_response import ORJSONResponse, dumps, orm_to_dict, stream_json_object
 from app.api.v1.endpoints.auth import get_current_user_id
-from app.services.analysis_service import AnalysisService
+from app.services.analysis_service import AnalysisService, get_analysis_service
 from app.schemas.analysis import (
     AnalysisResponse,
     AnalysisDetailResponse,
     AnalysisStartResponse,
+    BatchAnalysisRequest,
+    BatchAnalysisResponse,
     CodeIssueResponse
 )
 from app.crud import crud_analysis, crud_repository
 
 router = APIRouter()
-analysis_service = AnalysisService()
+
+def _analysis_detail_response(db: Session, analysis, issues_json: Optional[str]) -> Response:
+    """Build the AnalysisDetailResponse payload from an ORM row and DB-built issues JSON"""
+    detail = orm_to_dict(analysis, AnalysisResponse)
+    detail["analysis_data"] = analysis.analysis_data
+    
+    # Too many issues to aggregate into one value: stream them in batches instead
+    if issues_json is None:
+        return stream_json_object(detail, "issues", crud_analysis.iter_issue_rows(db, analysis.id))
+    
+    # Spliced into the output as-is; Postgres already rendered the array
+    detail["issues"] = orjson.Fragment(issues_json)
+    return ORJSONResponse(detail)
 
 @router.post("/analyze/{repository_id}", response_model=AnalysisStartResponse)
 async def start_analysis(
     repository_id: int,
     user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     """
     Start code analysis for a repository
     Runs synchronously to ensure proper error handling
     """
     # Verify repository exists and belongs to user
-    repository = crud_repository.get_repository_by_id(db, repository_id)
+    repository = crud_repository.get_repository_for_user(db, repository_id, user_id)
     
     if not repository:
         raise HTTPException(
@@ -35,15 +54,10 @@ async def start_analysis(
             detail="Repository not found"
         )
     
-    if repository.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this repository"
-        )
-    
     # Run analysis directly (for better error handling)
     try:
         analysis = await analysis_service.analyze_repository(db, user_id, repository_id)
+        await invalidate(user_id, "analyses")
         
         return AnalysisStartResponse(
             message="Analysis completed successfully",
@@ -65,12 +79,86 @@ async def start_analysis(
         db.add(failed_analysis)
         db.commit()
         db.refresh(failed_analysis)
+        await invalidate(user_id, "analyses")
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}"
         )
 
+@router.post("/analyze/{repository_id}/stream")
+async def stream_analysis(
+    repository_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    """
+    Run code analysis for a repository as Server-Sent Events
+    Model output is forwarded as it is generated, ending with a done (or error) event
+    
+    POST (it creates an analysis and spends tokens) with the bearer token, so read it
+    with fetch() streaming rather than EventSource. Each event is a `data: <json>` line
+    followed by a blank line: {"type": "delta", "content"}, then {"type": "done",
+    "analysis_id", "status"} or {"type": "error", "detail"}.
+    """
+    # Verify repository exists and belongs to user
+    repository = crud_repository.get_repository_for_user(db, repository_id, user_id)
+    
+    if not repository:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Repository not found"
+        )
+    
+    async def events():
+        try:
+            async for event in analysis_service.analyze_repository_stream(db, user_id, repository_id):
+                if event["type"] == "done":
+                    event = {
+                        "type": "done",
+                        "analysis_id": event["analysis"].id,
+                        "status": event["analysis"].status
+                    }
+                yield b"data: " + dumps(event) + b"\n\n"
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield b"data: " + dumps({"type": "error", "detail": f"Analysis failed: {detail}"}) + b"\n\n"
+        finally:
+            await invalidate(user_id, "analyses")
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.post("/batch", response_model=BatchAnalysisResponse)
+async def start_batch_analysis(
+    batch_request: BatchAnalysisRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
+    """
+    Queue non-interactive analyses through the OpenAI Batch API (half price)
+    Results arrive within 24 hours; run poll_batch_analyses.py to store them
+    """
+    try:
+        batch_id, analyses = await analysis_service.queue_batch_analyses(
+            db, user_id, batch_request.repository_ids
+        )
+        await invalidate(user_id, "analyses")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch submission failed: {str(e)}"
+        )
+    
+    return BatchAnalysisResponse(
+        message="Analyses queued" if batch_id else "No analyzable repositories found",
+        batch_id=batch_id,
+        analysis_ids=[analysis.id for analysis in analyses]
+    )
+
 @router.get("/list", response_model=List[AnalysisResponse])
 async def list_user_analyses(
     user_id: int = Depends(get_current_user_id),
@@ -79,8 +167,13 @@ async def list_user_analyses(
     limit: int = 50
 ):
     """Get all analyses for the current user"""
-    analyses = crud_analysis.get_user_analyses(db, user_id, skip, limit)
-    return [AnalysisResponse.from_orm(analysis) for analysis in analyses]
+    return await cached_response(
+        await cache_key(user_id, "analyses", skip, limit),
+        lambda: [
+            orm_to_dict(analysis, AnalysisResponse)
+            for analysis in crud_analysis.get_user_analyses(db, user_id, skip, limit)
+        ]
+    )
 
 @router.get("/repository/{repository_id}", response_model=List[AnalysisResponse])
 async def get_repository_analyses(
@@ -92,16 +185,16 @@ async def get_repository_analyses(
 ):
     """Get all analyses for a specific repository"""
     # Verify repository belongs to user
-    repository = crud_repository.get_repository_by_id(db, repository_id)
+    repository = crud_repository.get_repository_for_user(db, repository_id, user_id)
     
-    if not repository or repository.user_id != user_id:
+    if not repository:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
     analyses = crud_analysis.get_repository_analyses(db, repository_id, skip, limit)
-    return [AnalysisResponse.from_orm(analysis) for analysis in analyses]
+    return ORJSONResponse([orm_to_dict(analysis, AnalysisResponse) for analysis in analyses])
 
 @router.get("/{analysis_id}", response_model=AnalysisDetailResponse)
 async def get_analysis(
@@ -110,29 +203,15 @@ async def get_analysis(
     db: Session = Depends(get_db)
 ):
     """Get detailed analysis results including all issues"""
-    analysis = crud_analysis.get_analysis_by_id(db, analysis_id)
+    row = crud_analysis.get_analysis_detail_for_user(db, analysis_id, user_id)
     
-    if not analysis:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Analysis not found"
         )
     
-    # Verify analysis belongs to user
-    if analysis.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
-    
-    # Get issues
-    issues = crud_analysis.get_analysis_issues(db, analysis_id)
-    
-    # Build response
-    response = AnalysisDetailResponse.from_orm(analysis)
-    response.issues = [CodeIssueResponse.from_orm(issue) for issue in issues]
-    
-    return response
+    return _analysis_detail_response(db, *row)
 
 @router.get("/{analysis_id}/issues", response_model=List[CodeIssueResponse])
 async def get_analysis_issues(
@@ -142,16 +221,16 @@ async def get_analysis_issues(
     db: Session = Depends(get_db)
 ):
     """Get issues for an analysis, optionally filtered by severity"""
-    analysis = crud_analysis.get_analysis_by_id(db, analysis_id)
+    analysis = crud_analysis.get_analysis_for_user(db, analysis_id, user_id)
     
-    if not analysis or analysis.user_id != user_id:
+    if not analysis:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
     issues = crud_analysis.get_analysis_issues(db, analysis_id, severity)
-    return [CodeIssueResponse.from_orm(issue) for issue in issues]
+    return ORJSONResponse([orm_to_dict(issue, CodeIssueResponse) for issue in issues])
 
 @router.delete("/{analysis_id}")
 async def delete_analysis(
@@ -160,15 +239,16 @@ async def delete_analysis(
     db: Session = Depends(get_db)
 ):
     """Delete an analysis"""
-    analysis = crud_analysis.get_analysis_by_id(db, analysis_id)
+    analysis = crud_analysis.get_analysis_for_user(db, analysis_id, user_id)
     
-    if not analysis or analysis.user_id != user_id:
+    if not analysis:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
     success = crud_analysis.delete_analysis(db, analysis_id)
+    await invalidate(user_id, "analyses")
     
     if not success:
         raise HTTPException(
@@ -186,30 +266,23 @@ async def get_latest_repository_analysis(
 ):
     """Get the most recent completed analysis for a repository"""
     # Verify repository belongs to user
-    repository = crud_repository.get_repository_by_id(db, repository_id)
+    repository = crud_repository.get_repository_for_user(db, repository_id, user_id)
     
-    if not repository or repository.user_id != user_id:
+    if not repository:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    analysis = crud_analysis.get_latest_analysis(db, repository_id)
+    row = crud_analysis.get_latest_analysis_detail(db, repository_id)
     
-    if not analysis:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No completed analysis found for this repository"
         )
     
-    # Get issues
-    issues = crud_analysis.get_analysis_issues(db, analysis.id)
-    
-    # Build response
-    response = AnalysisDetailResponse.from_orm(analysis)
-    response.issues = [CodeIssueResponse.from_orm(issue) for issue in issues]
-    
-    return response
+    return _analysis_detail_response(db, *row)
 
 @router.get("/")
 async def analysis_status():
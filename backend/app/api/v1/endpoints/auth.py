@@ -2,33 +2,33 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import datetime
+import logging
 
 from app.core.database import get_db
 from app.core.auth import create_access_token, verify_token
-from app.services.github_auth import GitHubAuthService
+from app.core.orjson_response import ORJSONResponse, orm_to_dict
+from app.services.github_auth import GitHubAuthService, get_github_auth_service
 from app.schemas.user import LoginRequest, Token, UserResponse, UserCreate
 from app.crud import crud_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 security = HTTPBearer()
-github_service = GitHubAuthService()
+
+# The login URL only depends on static OAuth settings, so build it once
+_AUTH_URL = get_github_auth_service().get_authorization_url()
 
 @router.get("/github/login")
 async def github_login():
     """Initiate GitHub OAuth login"""
-    try:
-        auth_url = github_service.get_authorization_url()
-        return {"auth_url": auth_url}
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    return {"auth_url": _AUTH_URL}
 
 @router.post("/github/callback", response_model=Token)
 async def github_callback(
     login_request: LoginRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    github_service: GitHubAuthService = Depends(get_github_auth_service)
 ):
     """Handle GitHub OAuth callback and create/update user"""
     try:
@@ -54,29 +54,17 @@ async def github_callback(
         # Create JWT token
         access_token = create_access_token(data={"sub": str(db_user.id)})
         
-        # Prepare user response
-        user_response = UserResponse(
-            id=db_user.id,
-            github_id=db_user.github_id,
-            username=db_user.username,
-            name=db_user.name,
-            email=db_user.email,
-            avatar_url=db_user.avatar_url,
-            github_url=db_user.github_url,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at
-        )
-        
-        return Token(
-            access_token=access_token,
-            token_type="bearer",
-            user=user_response
-        )
+        # Prepare user response (trusted DB row, no revalidation)
+        return ORJSONResponse({
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": orm_to_dict(db_user, UserResponse)
+        })
         
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Callback error: {str(e)}")
+        logger.warning("GitHub callback failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Authentication failed: {str(e)}"
@@ -112,17 +100,7 @@ async def get_current_user(
             detail="User not found"
         )
     
-    return UserResponse(
-        id=db_user.id,
-        github_id=db_user.github_id,
-        username=db_user.username,
-        name=db_user.name,
-        email=db_user.email,
-        avatar_url=db_user.avatar_url,
-        github_url=db_user.github_url,
-        is_active=db_user.is_active,
-        created_at=db_user.created_at
-    )
+    return ORJSONResponse(orm_to_dict(db_user, UserResponse))
 
 @router.post("/logout")
 async def logout(user_id: int = Depends(get_current_user_id)):
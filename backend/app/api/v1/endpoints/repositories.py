@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
+import logging
 
 from app.core.database import get_db
+from app.core.cache import cache_key, cached_response, invalidate
+from app.core.orjson_response import ORJSONResponse, orm_to_dict
 from app.api.v1.endpoints.auth import get_current_user_id
-from app.services.github_repo import GitHubRepoService
+from app.services.github_repo import GitHubRepoService, get_github_repo_service
 from app.schemas.repository import RepositoryResponse, RepositorySyncResponse
 from app.crud import crud_user, crud_repository
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
-github_repo_service = GitHubRepoService()
 
 @router.get("/")
 async def repositories_status():
@@ -19,7 +23,8 @@ async def repositories_status():
 @router.post("/sync", response_model=RepositorySyncResponse)
 async def sync_repositories(
     user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    github_repo_service: GitHubRepoService = Depends(get_github_repo_service)
 ):
     """Sync user's GitHub repositories to database"""
     try:
@@ -36,29 +41,29 @@ async def sync_repositories(
             db_user.github_access_token
         )
         
-        # Parse and save repositories to database
-        synced_repos = []
-        for repo in github_repos:
-            repo_data = github_repo_service.parse_repository_data(repo)
-            db_repo = crud_repository.create_or_update_repository(
-                db, user_id, repo_data
-            )
-            synced_repos.append(db_repo)
+        # Parse and save repositories to database in one round trip
+        synced_count = crud_repository.bulk_upsert_repositories(
+            db,
+            user_id,
+            [github_repo_service.parse_repository_data(repo) for repo in github_repos]
+        )
+        
+        await invalidate(user_id, "repositories", "stats")
         
         # Get updated repository list
-        all_user_repos = crud_repository.get_user_repositories(db, user_id)
+        all_user_repos, total_count = crud_repository.get_user_repositories_with_count(db, user_id)
         
-        return RepositorySyncResponse(
-            message="Repositories synced successfully",
-            synced_count=len(synced_repos),
-            total_count=len(all_user_repos),
-            repositories=[RepositoryResponse.from_orm(repo) for repo in all_user_repos]
-        )
+        return ORJSONResponse({
+            "message": "Repositories synced successfully",
+            "synced_count": synced_count,
+            "total_count": total_count,
+            "repositories": [orm_to_dict(repo, RepositoryResponse) for repo in all_user_repos]
+        })
         
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Sync error: {str(e)}")
+        logger.warning("Repository sync failed for user %s: %s", user_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to sync repositories: {str(e)}"
@@ -72,8 +77,13 @@ async def list_repositories(
     limit: int = 100
 ):
     """Get list of user's repositories from database"""
-    repositories = crud_repository.get_user_repositories(db, user_id, skip, limit)
-    return [RepositoryResponse.from_orm(repo) for repo in repositories]
+    return await cached_response(
+        await cache_key(user_id, "repositories", skip, limit),
+        lambda: [
+            orm_to_dict(repo, RepositoryResponse)
+            for repo in crud_repository.get_user_repositories(db, user_id, skip, limit)
+        ]
+    )
 
 @router.get("/{repo_id}", response_model=RepositoryResponse)
 async def get_repository(
@@ -82,7 +92,7 @@ async def get_repository(
     db: Session = Depends(get_db)
 ):
     """Get a specific repository by ID"""
-    repository = crud_repository.get_repository_by_id(db, repo_id)
+    repository = crud_repository.get_repository_for_user(db, repo_id, user_id)
     
     if not repository:
         raise HTTPException(
@@ -90,14 +100,7 @@ async def get_repository(
             detail="Repository not found"
         )
     
-    # Verify the repository belongs to the user
-    if repository.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this repository"
-        )
-    
-    return RepositoryResponse.from_orm(repository)
+    return ORJSONResponse(orm_to_dict(repository, RepositoryResponse))
 
 @router.delete("/{repo_id}")
 async def delete_repository(
@@ -106,7 +109,7 @@ async def delete_repository(
     db: Session = Depends(get_db)
 ):
     """Delete a repository from database"""
-    repository = crud_repository.get_repository_by_id(db, repo_id)
+    repository = crud_repository.get_repository_for_user(db, repo_id, user_id)
     
     if not repository:
         raise HTTPException(
@@ -114,14 +117,8 @@ async def delete_repository(
             detail="Repository not found"
         )
     
-    # Verify the repository belongs to the user
-    if repository.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this repository"
-        )
-    
     crud_repository.delete_repository(db, repo_id)
+    await invalidate(user_id, "repositories", "stats", "analyses")
     return {"message": "Repository deleted successfully"}
 
 @router.get("/stats/summary")
@@ -130,22 +127,7 @@ async def get_repository_stats(
     db: Session = Depends(get_db)
 ):
     """Get repository statistics for the user"""
-    total_repos = crud_repository.get_repository_count(db, user_id)
-    repos = crud_repository.get_user_repositories(db, user_id)
-    
-    # Calculate statistics
-    total_stars = sum(repo.stars_count for repo in repos)
-    total_forks = sum(repo.forks_count for repo in repos)
-    languages = {}
-    for repo in repos:
-        if repo.language:
-            languages[repo.language] = languages.get(repo.language, 0) + 1
-    
-    return {
-        "total_repositories": total_repos,
-        "total_stars": total_stars,
-        "total_forks": total_forks,
-        "languages": languages,
-        "private_repos": sum(1 for repo in repos if repo.is_private),
-        "public_repos": sum(1 for repo in repos if not repo.is_private)
-    }
\ No newline at end of file
+    return await cached_response(
+        await cache_key(user_id, "stats"),
+        lambda: crud_repository.get_stats_summary(db, user_id)
+    )
\ No newline at end of file
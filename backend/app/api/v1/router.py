@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import auth, repositories, analysis
+from app.core.orjson_response import ORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 router.include_router(repositories.router, prefix="/repositories", tags=["Repositories"])
@@ -1,15 +1,14 @@
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-import os
+from functools import lru_cache
+from typing import Optional, Tuple
+import time
+import jwt
+from app.core.config import get_settings
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
+SECRET_KEY = get_settings().jwt_secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -20,13 +19,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+@lru_cache(maxsize=4096)
+def _decode_token(token: str) -> Optional[Tuple[int, float]]:
+    """Verify a token's signature once and cache (user_id, exp timestamp)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")  # JWT returns string
         if user_id is None:
             return None
         # CRITICAL FIX: Convert string to integer
-        return int(user_id)
-    except (JWTError, ValueError, TypeError):
-        return None
\ No newline at end of file
+        return int(user_id), float(payload.get("exp", float("inf")))
+    except (jwt.PyJWTError, ValueError, TypeError):
+        return None
+
+def verify_token(token: str):
+    decoded = _decode_token(token)
+    if decoded is None:
+        return None
+    
+    # Cached entries outlive the decode, so expiry is re-checked on every call
+    user_id, expires_at = decoded
+    if expires_at <= time.time():
+        return None
+    return user_id
\ No newline at end of file
@@ -0,0 +1,91 @@
+import logging
+from typing import Any, Callable, Optional
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from fastapi.responses import Response
+
+from app.core.config import get_settings
+from app.core.orjson_response import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = get_settings().redis_url
+CACHE_PREFIX = "cc"
+DEFAULT_EXPIRE = 60  # seconds
+
+# Caching is disabled when REDIS_URL is not configured
+redis_client: Optional[redis.Redis] = redis.from_url(REDIS_URL) if REDIS_URL else None
+
+def _version_key(user_id: int, namespace: str) -> str:
+    """Key of the counter that invalidate() bumps to retire a user namespace"""
+    return ":".join([CACHE_PREFIX, str(user_id), namespace, "v"])
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """Read raw bytes from the cache; None when missing, disabled or Redis is down"""
+    if redis_client is None:
+        return None
+
+    try:
+        return await redis_client.get(key)
+    except RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+
+async def cache_set(key: str, value: bytes, expire: int = DEFAULT_EXPIRE) -> None:
+    """Write raw bytes to the cache (no-op when disabled or Redis is down)"""
+    if redis_client is None:
+        return
+
+    try:
+        await redis_client.set(key, value, ex=expire)
+    except RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+async def cache_key(user_id: int, namespace: str, *parts: Any) -> str:
+    """
+    Build a user-scoped cache key so one user's data is never served to another
+
+    The key embeds the namespace's current version, so entries cached before
+    the last invalidate() are never read again and age out with their TTL.
+    """
+    version = await cache_get(_version_key(user_id, namespace))
+    return ":".join([CACHE_PREFIX, str(user_id), namespace, (version or b"0").decode(), *map(str, parts)])
+
+async def cached_response(
+    key: str,
+    build: Callable[[], Any],
+    expire: int = DEFAULT_EXPIRE
+) -> Response:
+    """
+    Serve the JSON body cached under key, or build, encode and cache it
+
+    The cache stores the encoded bytes, so a hit skips the database,
+    the Python object building and the JSON encoding entirely.
+    """
+    if redis_client is None:
+        return ORJSONResponse(build())
+
+    body = await cache_get(key)
+    if body is None:
+        body = ORJSONResponse(build()).body
+        await cache_set(key, body, expire)
+
+    return Response(content=body, media_type="application/json")
+
+async def invalidate(user_id: int, *namespaces: str) -> None:
+    """Retire every cached entry for the given user namespaces by bumping their versions"""
+    if redis_client is None:
+        return
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(_version_key(user_id, namespace))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Cache invalidation failed for user %s: %s", user_id, e)
+
+async def close_cache() -> None:
+    """Close the Redis connection pool"""
+    if redis_client is not None:
+        await redis_client.close()
@@ -0,0 +1,37 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Repository-root .env, resolved from this file so scripts work from any directory
+ENV_FILE = Path(__file__).resolve().parents[3] / ".env"
+
+class Settings(BaseSettings):
+    """Application settings, read from the environment once per process"""
+    model_config = SettingsConfigDict(extra="ignore")
+    
+    env: Optional[str] = None
+    database_url: Optional[str] = None
+    redis_url: Optional[str] = None
+    auto_migrate: bool = False
+    web_concurrency: int = 4
+    cors_origins: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    
+    github_client_id: Optional[str] = None
+    github_client_secret: Optional[str] = None
+    github_redirect_uri: Optional[str] = None
+    jwt_secret_key: str = "your-secret-key-here"
+    
+    openai_api_key: Optional[str] = None
+    openai_base_url: str = "https://api.openai.com/v1"
+    openai_model: str = "gpt-4o-mini"
+    cheap_model: str = "gpt-4.1-nano"
+    use_mock_analysis: bool = False
+
+@lru_cache
+def get_settings() -> Settings:
+    """Get the cached application settings (parses .env on first call only)"""
+    # Real environment variables take precedence over .env
+    load_dotenv(ENV_FILE)
+    return Settings()
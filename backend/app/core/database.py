@@ -1,15 +1,30 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from app.core.config import get_settings
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = get_settings().database_url
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=20,         # Default of 5 is exhausted quickly under concurrent requests
+    max_overflow=10,
+    pool_pre_ping=True,   # Replace connections the server has dropped before using them
+    pool_recycle=3600     # Recycle connections hourly
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def register_models() -> None:
+    """
+    Import every model module so the mappers and Base.metadata are complete
+
+    For entry points (Alembic, scripts) that may not import all of them
+    otherwise; the API already loads them through the crud modules.
+    """
+    from app.models import user, repository, analysis  # noqa: F401
+
 def get_db():
     db = SessionLocal()
     try:
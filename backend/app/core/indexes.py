@@ -0,0 +1,21 @@
+from sqlalchemy import Index
+from app.models.analysis import Analysis, CodeIssue
+
+# Composite indexes matching the filter + order_by shapes in app/crud.
+# Defining them against the mapped tables registers them on Base.metadata,
+# so create_all builds them for fresh databases; migration 0002 adds them to
+# existing ones (new indexes need a new migration).
+HOT_PATH_INDEXES = [
+    # get_user_analyses: user_id filter, created_at DESC
+    Index("ix_analysis_user_created", Analysis.user_id, Analysis.created_at),
+    # get_repository_analyses / get_latest_analysis_detail: repository_id (+ status), created_at DESC
+    Index(
+        "ix_analysis_repo_status_created",
+        Analysis.repository_id, Analysis.status, Analysis.created_at
+    ),
+    # get_analysis_issues: analysis_id filter, severity DESC, line_number
+    Index(
+        "ix_issue_analysis_sev_line",
+        CodeIssue.analysis_id, CodeIssue.severity, CodeIssue.line_number
+    ),
+]
@@ -0,0 +1,54 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Type
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+STREAM_BATCH_SIZE = 500
+
+def dumps(content: Any) -> bytes:
+    # orjson handles datetime/UUID natively; default=str covers the rest (e.g. Decimal)
+    return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def stream_json_object(
+    head: Dict[str, Any],
+    key: str,
+    items: Iterable[Any],
+    batch_size: int = STREAM_BATCH_SIZE
+) -> StreamingResponse:
+    """
+    Stream head as a JSON object whose `key` field holds items
+
+    Items are encoded batch_size at a time, so peak memory doesn't grow with
+    the size of the list and the client can start parsing early.
+    """
+    def generate() -> Iterator[bytes]:
+        opening = dumps(head)[:-1]
+        yield opening + (b"," if head else b"") + dumps(key) + b":["
+        
+        iterator = iter(items)
+        separator = b""
+        while batch := list(islice(iterator, batch_size)):
+            yield separator + dumps(batch)[1:-1]
+            separator = b","
+        
+        yield b"]}"
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+def orm_to_dict(obj: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Copy a schema's fields off a trusted ORM row, skipping Pydantic validation
+
+    Endpoints keep their response_model for the OpenAPI docs; returning an
+    ORJSONResponse built from these dicts bypasses FastAPI's revalidation
+    and jsonable_encoder pass.
+    """
+    return {field: getattr(obj, field) for field in schema.model_fields}
@@ -1,11 +1,68 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Text, case, cast, func, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session, raiseload
 from app.models.analysis import Analysis, CodeIssue
-from typing import List, Optional
+from app.schemas.analysis import CodeIssueResponse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Analyses with more issues than this are streamed in batches instead of aggregated in one value
+STREAM_ISSUES_THRESHOLD = 500
 
 def get_analysis_by_id(db: Session, analysis_id: int) -> Optional[Analysis]:
     """Get analysis by ID"""
     return db.query(Analysis).filter(Analysis.id == analysis_id).first()
 
+def get_analysis_for_user(
+    db: Session,
+    analysis_id: int,
+    user_id: int
+) -> Optional[Analysis]:
+    """Get analysis by ID only if it belongs to the user"""
+    return db.query(Analysis).filter(
+        Analysis.id == analysis_id,
+        Analysis.user_id == user_id
+    ).first()
+
+def _issues_json():
+    """
+    Correlated subquery rendering an analysis' issues as a JSON array string
+
+    Postgres builds and orders the array (same order as get_analysis_issues),
+    so issues are never hydrated as ORM objects or re-encoded in Python.
+    NULL for analyses above STREAM_ISSUES_THRESHOLD; use iter_issue_rows for those.
+    """
+    issue_object = func.json_build_object(*[
+        arg
+        for field in CodeIssueResponse.model_fields
+        for arg in (literal(field), getattr(CodeIssue, field))
+    ])
+    issues = func.json_agg(aggregate_order_by(
+        issue_object,
+        CodeIssue.severity.desc(),
+        CodeIssue.line_number
+    ))
+    issues_json = select(
+        cast(func.coalesce(issues, text("'[]'::json")), Text)
+    ).where(
+        CodeIssue.analysis_id == Analysis.id
+    ).scalar_subquery()
+    # A single text value is read fully into memory, so large lists are left to streaming
+    return case(
+        (Analysis.total_issues > STREAM_ISSUES_THRESHOLD, None),
+        else_=issues_json
+    ).label("issues_json")
+
+def get_analysis_detail_for_user(
+    db: Session,
+    analysis_id: int,
+    user_id: int
+) -> Optional[Tuple[Analysis, str]]:
+    """Get a user's analysis and its issues as a JSON array in one query"""
+    return db.query(Analysis, _issues_json()).filter(
+        Analysis.id == analysis_id,
+        Analysis.user_id == user_id
+    ).first()
+
 def get_repository_analyses(
     db: Session, 
     repository_id: int,
@@ -13,7 +70,7 @@ def get_repository_analyses(
     limit: int = 20
 ) -> List[Analysis]:
     """Get all analyses for a repository"""
-    return db.query(Analysis).filter(
+    return db.query(Analysis).options(raiseload("*")).filter(
         Analysis.repository_id == repository_id
     ).order_by(Analysis.created_at.desc()).offset(skip).limit(limit).all()
 
@@ -24,7 +81,7 @@ def get_user_analyses(
     limit: int = 50
 ) -> List[Analysis]:
     """Get all analyses for a user"""
-    return db.query(Analysis).filter(
+    return db.query(Analysis).options(raiseload("*")).filter(
         Analysis.user_id == user_id
     ).order_by(Analysis.created_at.desc()).offset(skip).limit(limit).all()
 
@@ -44,9 +101,42 @@ def get_analysis_issues(
         CodeIssue.line_number
     ).all()
 
+def iter_issue_rows(
+    db: Session,
+    analysis_id: int,
+    batch_size: int = STREAM_ISSUES_THRESHOLD
+) -> Iterator[Dict[str, Any]]:
+    """Yield an analysis' issues as plain dicts from a server-side cursor, batch_size rows at a time"""
+    columns = [getattr(CodeIssue, field) for field in CodeIssueResponse.model_fields]
+    result = db.execute(
+        select(*columns).where(
+            CodeIssue.analysis_id == analysis_id
+        ).order_by(
+            CodeIssue.severity.desc(),
+            CodeIssue.line_number
+        ).execution_options(yield_per=batch_size)
+    )
+    for row in result.mappings():
+        yield dict(row)
+
+def bulk_create_issues(
+    db: Session,
+    analysis_id: int,
+    issues: List[Dict[str, Any]]
+) -> None:
+    """Insert all issues for an analysis in a single statement and commit"""
+    if issues:
+        # Core executemany; on Postgres this is batched into multi-row INSERT ... VALUES
+        db.execute(
+            insert(CodeIssue),
+            [{"analysis_id": analysis_id, **issue} for issue in issues]
+        )
+    db.commit()
+
 def delete_analysis(db: Session, analysis_id: int) -> bool:
     """Delete an analysis and its issues"""
-    analysis = get_analysis_by_id(db, analysis_id)
+    # Session.get reuses the instance if the caller already loaded it
+    analysis = db.get(Analysis, analysis_id)
     if not analysis:
         return False
     
@@ -58,9 +148,27 @@ def delete_analysis(db: Session, analysis_id: int) -> bool:
     db.commit()
     return True
 
-def get_latest_analysis(db: Session, repository_id: int) -> Optional[Analysis]:
-    """Get the most recent completed analysis for a repository"""
-    return db.query(Analysis).filter(
+def get_latest_analysis_detail(
+    db: Session,
+    repository_id: int
+) -> Optional[Tuple[Analysis, str]]:
+    """Get the most recent completed analysis and its issues as a JSON array"""
+    return db.query(Analysis, _issues_json()).filter(
         Analysis.repository_id == repository_id,
         Analysis.status == "completed"
-    ).order_by(Analysis.created_at.desc()).first()
\ No newline at end of file
+    ).order_by(Analysis.created_at.desc()).first()
+
+def get_queued_batch_analyses(db: Session, batch_id: str) -> List[Analysis]:
+    """Get analyses still waiting on the given OpenAI batch"""
+    return db.query(Analysis).filter(
+        Analysis.status == "queued",
+        Analysis.analysis_data["batch_id"].as_string() == batch_id
+    ).all()
+
+def get_pending_batch_ids(db: Session) -> List[str]:
+    """Get the distinct OpenAI batch ids that still have queued analyses"""
+    batch_id = Analysis.analysis_data["batch_id"].as_string()
+    return [
+        row[0] for row in
+        db.query(batch_id).filter(Analysis.status == "queued", batch_id.isnot(None)).distinct()
+    ]
@@ -1,73 +1,109 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, raiseload
 from app.models.repository import Repository
-from typing import List, Optional
+from app.models.user import User
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
 def get_repository_by_id(db: Session, repo_id: int) -> Optional[Repository]:
     """Get repository by ID"""
     return db.query(Repository).filter(Repository.id == repo_id).first()
 
+def get_repository_for_user(db: Session, repo_id: int, user_id: int) -> Optional[Repository]:
+    """Get repository by ID only if it belongs to the user"""
+    return db.query(Repository).filter(
+        Repository.id == repo_id,
+        Repository.user_id == user_id
+    ).first()
+
+def get_repo_and_token(db: Session, repository_id: int, user_id: int) -> Optional[Row]:
+    """Get the repository fields and owner's GitHub token needed for analysis in one query"""
+    return db.execute(
+        select(
+            Repository.full_name,
+            Repository.language,
+            Repository.default_branch,
+            User.github_access_token
+        )
+        .join(User, User.id == Repository.user_id)
+        .where(Repository.id == repository_id, User.id == user_id)
+    ).one_or_none()
+
+def get_repos_and_tokens(db: Session, repository_ids: List[int], user_id: int) -> List[Row]:
+    """get_repo_and_token for several of the user's repositories in one query (missing ids are skipped)"""
+    return db.execute(
+        select(
+            Repository.id,
+            Repository.full_name,
+            Repository.language,
+            Repository.default_branch,
+            User.github_access_token
+        )
+        .join(User, User.id == Repository.user_id)
+        .where(Repository.id.in_(repository_ids), User.id == user_id)
+    ).all()
+
 def get_repository_by_github_id(db: Session, github_id: int) -> Optional[Repository]:
     """Get repository by GitHub ID"""
     return db.query(Repository).filter(Repository.github_id == github_id).first()
 
 def get_user_repositories(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Repository]:
     """Get all repositories for a user"""
-    return db.query(Repository).filter(
+    return db.query(Repository).options(raiseload("*")).filter(
         Repository.user_id == user_id
     ).offset(skip).limit(limit).all()
 
-def create_repository(db: Session, user_id: int, repo_data: dict) -> Repository:
-    """Create a new repository"""
-    db_repo = Repository(
-        user_id=user_id,
-        **repo_data,
-        last_synced_at=datetime.utcnow()
-    )
-    db.add(db_repo)
-    db.commit()
-    db.refresh(db_repo)
-    return db_repo
+def get_user_repositories_with_count(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100
+) -> Tuple[List[Repository], int]:
+    """Get a page of a user's repositories and their total count in one query"""
+    rows = db.query(
+        Repository,
+        func.count().over().label("total")
+    ).options(raiseload("*")).filter(
+        Repository.user_id == user_id
+    ).offset(skip).limit(limit).all()
+    
+    if not rows:
+        return [], 0
+    return [repo for repo, _ in rows], rows[0].total
 
-def update_repository(db: Session, repo_id: int, repo_data: dict) -> Optional[Repository]:
-    """Update repository information"""
-    db_repo = get_repository_by_id(db, repo_id)
-    if not db_repo:
-        return None
+def bulk_upsert_repositories(db: Session, user_id: int, repos: List[Dict[str, Any]]) -> int:
+    """Create or update many repositories with a single INSERT ... ON CONFLICT"""
+    if not repos:
+        return 0
     
-    for key, value in repo_data.items():
-        if hasattr(db_repo, key):
-            setattr(db_repo, key, value)
+    synced_at = datetime.utcnow()
+    # Keyed by github_id: Postgres rejects a statement that updates the same row twice
+    rows = {
+        repo["github_id"]: {**repo, "user_id": user_id, "last_synced_at": synced_at}
+        for repo in repos
+    }
     
-    db_repo.last_synced_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_repo)
-    return db_repo
-
-def create_or_update_repository(db: Session, user_id: int, repo_data: dict) -> Repository:
-    """Create a new repository or update if it exists"""
-    existing_repo = get_repository_by_github_id(db, repo_data["github_id"])
+    stmt = pg_insert(Repository).values(list(rows.values()))
+    update_columns = {
+        key: stmt.excluded[key]
+        for key in next(iter(rows.values()))
+        if key != "github_id"
+    }
+    # Column onupdate hooks don't fire for ON CONFLICT updates
+    update_columns["updated_at"] = func.now()
     
-    if existing_repo:
-        # Update existing repository
-        for key, value in repo_data.items():
-            if hasattr(existing_repo, key):
-                setattr(existing_repo, key, value)
-        
-        # FIX: Always update user_id to current logged-in user
-        existing_repo.user_id = user_id
-        existing_repo.last_synced_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(existing_repo)
-        return existing_repo
-    else:
-        # Create new repository
-        return create_repository(db, user_id, repo_data)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Repository.github_id],
+        set_=update_columns
+    ))
+    db.commit()
+    return len(rows)
 
 def delete_repository(db: Session, repo_id: int) -> bool:
     """Delete a repository"""
-    db_repo = get_repository_by_id(db, repo_id)
+    # Session.get reuses the instance if the caller already loaded it
+    db_repo = db.get(Repository, repo_id)
     if not db_repo:
         return False
     
@@ -75,6 +111,25 @@ def delete_repository(db: Session, repo_id: int) -> bool:
     db.commit()
     return True
 
-def get_repository_count(db: Session, user_id: int) -> int:
-    """Get total repository count for a user"""
-    return db.query(Repository).filter(Repository.user_id == user_id).count()
\ No newline at end of file
+def get_stats_summary(db: Session, user_id: int) -> Dict[str, Any]:
+    """Aggregate repository statistics for a user without loading the rows"""
+    total_repos, total_stars, total_forks, private_repos = db.query(
+        func.count(Repository.id),
+        func.coalesce(func.sum(Repository.stars_count), 0),
+        func.coalesce(func.sum(Repository.forks_count), 0),
+        func.count(case((Repository.is_private, 1)))
+    ).filter(Repository.user_id == user_id).one()
+    
+    languages = db.query(Repository.language, func.count(Repository.id)).filter(
+        Repository.user_id == user_id,
+        Repository.language.isnot(None)
+    ).group_by(Repository.language).all()
+    
+    return {
+        "total_repositories": total_repos,
+        "total_stars": total_stars,
+        "total_forks": total_forks,
+        "languages": dict(languages),
+        "private_repos": private_repos,
+        "public_repos": total_repos - private_repos
+    }
\ No newline at end of file
@@ -46,4 +46,12 @@ class AnalysisDetailResponse(AnalysisResponse):
 class AnalysisStartResponse(BaseModel):
     message: str
     analysis_id: int
-    status: str
\ No newline at end of file
+    status: str
+
+class BatchAnalysisRequest(BaseModel):
+    repository_ids: List[int]
+
+class BatchAnalysisResponse(BaseModel):
+    message: str
+    batch_id: Optional[str]
+    analysis_ids: List[int]
@@ -1,17 +1,23 @@
+import asyncio
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import Dict, Any
-from app.services.github_code import GitHubCodeService
-from app.services.openai_service import OpenAIService
-from app.models.analysis import Analysis, CodeIssue
-from app.crud import crud_user, crud_repository
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from collections import Counter
+from fastapi import Depends
+from app.services.github_code import GitHubCodeService, get_github_code_service
+from app.services.openai_service import OpenAIService, get_openai_service
+from app.core.cache import invalidate
+from app.models.analysis import Analysis
+from app.crud import crud_repository, crud_analysis
+
+_SEVERITIES = frozenset({"critical", "high", "medium", "low"})
 
 class AnalysisService:
     """Orchestrates the code analysis process"""
     
-    def __init__(self):
-        self.github_service = GitHubCodeService()
-        self.openai_service = OpenAIService()
+    def __init__(self, github_service: GitHubCodeService, openai_service: OpenAIService):
+        self.github_service = github_service
+        self.openai_service = openai_service
     
     async def analyze_repository(
         self,
@@ -29,6 +35,25 @@ class AnalysisService:
         4. Parse and store results
         5. Create issue records
         """
+        async for event in self.analyze_repository_stream(db, user_id, repository_id):
+            if event["type"] == "done":
+                return event["analysis"]
+    
+    async def analyze_repository_stream(
+        self,
+        db: Session,
+        user_id: int,
+        repository_id: int
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the analysis workflow, yielding model output as it streams in
+        
+        Yields {"type": "delta", "content": ...} events, then
+        {"type": "done", "analysis": Analysis} once results are stored.
+        """
+        # Get repository info and the owner's token in one query
+        repository = crud_repository.get_repo_and_token(db, repository_id, user_id)
+        
         # Create initial analysis record
         analysis = Analysis(
             repository_id=repository_id,
@@ -36,15 +61,12 @@ class AnalysisService:
             status="processing"
         )
         db.add(analysis)
+        # Committed up front: the row is visible while processing, and no transaction
+        # (or pooled connection) is held across the GitHub and OpenAI calls below
         db.commit()
-        db.refresh(analysis)
         
         try:
-            # Get repository and user info
-            repository = crud_repository.get_repository_by_id(db, repository_id)
-            user = crud_user.get_user_by_id(db, user_id)
-            
-            if not repository or not user:
+            if not repository:
                 raise Exception("Repository or user not found")
             
             # Extract owner and repo name from full_name
@@ -52,10 +74,11 @@ class AnalysisService:
             
             # Fetch repository code (smart sampling)
             code_data = await self.github_service.fetch_repository_code(
-                access_token=user.github_access_token,
+                access_token=repository.github_access_token,
                 owner=owner,
                 repo=repo_name,
-                language=repository.language
+                language=repository.language,
+                branch=repository.default_branch
             )
             
             analysis.files_analyzed = code_data["total_files"]
@@ -68,60 +91,171 @@ class AnalysisService:
                 analysis.overall_score = 0
                 analysis.completed_at = datetime.utcnow()
                 db.commit()
-                return analysis
+                yield {"type": "done", "analysis": analysis}
+                return
             
             # Analyze code with OpenAI
-            analysis_result = self.openai_service.analyze_code(
+            analysis_result = None
+            async for event in self.openai_service.analyze_code_stream(
                 code_files=code_data["files"],
                 language=code_data["language"]
-            )
+            ):
+                if event["type"] == "result":
+                    analysis_result = event["data"]
+                else:
+                    yield event
             
             # Update analysis with results
-            analysis.status = "completed"
-            analysis.overall_score = analysis_result.get("overall_score", 0)
-            analysis.summary = analysis_result.get("summary", "")
-            analysis.tokens_used = analysis_result.get("tokens_used", 0)
-            analysis.estimated_cost = analysis_result.get("estimated_cost", 0)
-            analysis.analysis_data = analysis_result
-            analysis.completed_at = datetime.utcnow()
-            
-            # Count issues by severity
-            issues = analysis_result.get("issues", [])
-            analysis.total_issues = len(issues)
+            issue_rows = self._apply_result(analysis, analysis_result)
             
-            severity_count = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-            for issue in issues:
-                severity = issue.get("severity", "low").lower()
-                if severity in severity_count:
-                    severity_count[severity] += 1
-            
-            analysis.critical_issues = severity_count["critical"]
-            analysis.high_issues = severity_count["high"]
-            analysis.medium_issues = severity_count["medium"]
-            analysis.low_issues = severity_count["low"]
-            
-            # Create issue records
-            for issue in issues:
-                code_issue = CodeIssue(
-                    analysis_id=analysis.id,
-                    severity=issue.get("severity", "low"),
-                    category=issue.get("category", "quality"),
-                    file_path=issue.get("file", "unknown"),
-                    line_number=issue.get("line"),
-                    title=issue.get("title", "Code issue"),
-                    description=issue.get("description", ""),
-                    suggestion=issue.get("suggestion", "")
-                )
-                db.add(code_issue)
-            
-            db.commit()
+            # Create issue records in one INSERT (commits the analysis too)
+            crud_analysis.bulk_create_issues(db, analysis.id, issue_rows)
             db.refresh(analysis)
-            return analysis
             
-        except Exception as e:
-            # Update analysis with error
+        except BaseException as e:
+            # Update analysis with error (also when the SSE client disconnects mid-stream)
             analysis.status = "failed"
-            analysis.error_message = str(e)
+            analysis.error_message = str(e) or "Analysis cancelled"
             analysis.completed_at = datetime.utcnow()
             db.commit()
-            raise e
\ No newline at end of file
+            raise e
+        
+        yield {"type": "done", "analysis": analysis}
+    
+    def _apply_result(self, analysis: Analysis, analysis_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Copy an OpenAI result onto the analysis and return its issue rows"""
+        analysis.status = "completed"
+        analysis.overall_score = analysis_result.get("overall_score", 0)
+        analysis.summary = analysis_result.get("summary", "")
+        analysis.tokens_used = analysis_result.get("tokens_used", 0)
+        analysis.estimated_cost = analysis_result.get("estimated_cost", 0)
+        analysis.analysis_data = analysis_result
+        analysis.completed_at = datetime.utcnow()
+        
+        # Count severities and build issue rows in a single pass
+        issues = analysis_result.get("issues", [])
+        analysis.total_issues = len(issues)
+        
+        severity_count = Counter()
+        issue_rows = []
+        for issue in issues:
+            severity = (issue.get("severity") or "low").lower()
+            if severity not in _SEVERITIES:
+                severity = "low"
+            severity_count[severity] += 1
+            issue_rows.append({
+                "severity": severity,
+                "category": issue.get("category", "quality"),
+                "file_path": issue.get("file", "unknown"),
+                "line_number": issue.get("line"),
+                "title": issue.get("title", "Code issue"),
+                "description": issue.get("description", ""),
+                "suggestion": issue.get("suggestion", "")
+            })
+        
+        analysis.critical_issues = severity_count["critical"]
+        analysis.high_issues = severity_count["high"]
+        analysis.medium_issues = severity_count["medium"]
+        analysis.low_issues = severity_count["low"]
+        
+        return issue_rows
+    
+    async def queue_batch_analyses(
+        self,
+        db: Session,
+        user_id: int,
+        repository_ids: List[int]
+    ) -> Tuple[Optional[str], List[Analysis]]:
+        """
+        Fetch code for several repositories and submit them as one Batch API job
+        
+        Analyses are stored as "queued" with the batch id in analysis_data;
+        apply_batch_results fills them in once OpenAI completes the batch.
+        """
+        # One query for every repository the user owns among the requested ids
+        repositories = crud_repository.get_repos_and_tokens(db, repository_ids, user_id)
+        
+        code_data = await asyncio.gather(*[
+            self.github_service.fetch_repository_code(
+                repository.github_access_token,
+                *repository.full_name.split('/'),
+                language=repository.language,
+                branch=repository.default_branch
+            )
+            for repository in repositories
+        ])
+        
+        analyses = []
+        code_file_groups = {}
+        for repository, data in zip(repositories, code_data):
+            if not data["files"]:
+                continue
+            
+            analysis = Analysis(
+                repository_id=repository.id,
+                user_id=user_id,
+                status="queued",
+                files_analyzed=data["total_files"],
+                lines_analyzed=data["total_lines"]
+            )
+            db.add(analysis)
+            db.flush()
+            analyses.append(analysis)
+            code_file_groups[str(analysis.id)] = data
+        
+        if not analyses:
+            db.rollback()
+            return None, []
+        
+        batch_id = await self.openai_service.submit_batch_analysis(code_file_groups)
+        
+        for analysis in analyses:
+            analysis.analysis_data = {"batch_id": batch_id}
+        db.commit()
+        
+        return batch_id, analyses
+    
+    async def apply_batch_results(self, db: Session, batch_id: str) -> int:
+        """Store a finished batch's results on its queued analyses; returns how many were updated"""
+        analyses = crud_analysis.get_queued_batch_analyses(db, batch_id)
+        if not analyses:
+            return 0
+        
+        try:
+            results = await self.openai_service.fetch_batch_results(batch_id)
+            batch_error = "No result returned for this analysis"
+        except ValueError as e:
+            results = {}
+            batch_error = str(e)
+        
+        # Still running
+        if results is None:
+            return 0
+        
+        for analysis in analyses:
+            result = results.get(str(analysis.id)) or {"error": batch_error}
+            
+            if "error" in result:
+                analysis.status = "failed"
+                analysis.error_message = result["error"]
+                analysis.completed_at = datetime.utcnow()
+                db.commit()
+                continue
+            
+            result["files_analyzed"] = analysis.files_analyzed
+            issue_rows = self._apply_result(analysis, result)
+            # Commits each analysis with its issues
+            crud_analysis.bulk_create_issues(db, analysis.id, issue_rows)
+        
+        # Cached analysis lists still show these as queued
+        for user_id in {analysis.user_id for analysis in analyses}:
+            await invalidate(user_id, "analyses")
+        
+        return len(analyses)
+
+def get_analysis_service(
+    github_service: GitHubCodeService = Depends(get_github_code_service),
+    openai_service: OpenAIService = Depends(get_openai_service)
+) -> AnalysisService:
+    """Build an AnalysisService around the shared service instances"""
+    return AnalysisService(github_service, openai_service)
@@ -0,0 +1,91 @@
+import hashlib
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import httpx
+
+# Upper bound on cached response bodies held in memory
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+class CachedBody(NamedTuple):
+    etag: Optional[str]
+    link: Optional[str]
+    body: bytes
+
+class ETagCache:
+    """Bounded in-process LRU of GitHub response bodies keyed by request"""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CachedBody) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous.body)
+        self._entries[key] = entry
+        self.total_bytes += len(entry.body)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted.body)
+
+etag_cache = ETagCache()
+
+def _request_key(request: httpx.Request) -> str:
+    """Key on the caller's token, media type and full URL so users never share entries"""
+    raw = "\n".join([
+        request.headers.get("Authorization", ""),
+        request.headers.get("Accept", ""),
+        str(request.url)
+    ])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _cached_response(entry: CachedBody, request: httpx.Request) -> httpx.Response:
+    headers = {name: value for name, value in (("ETag", entry.etag), ("Link", entry.link)) if value}
+    return httpx.Response(200, headers=headers, content=entry.body, request=request)
+
+async def cached_get(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    params: Optional[dict] = None,
+    immutable: bool = False
+) -> httpx.Response:
+    """
+    GET with ETag revalidation against the in-process cache
+
+    A cached entry is revalidated with If-None-Match; GitHub answers unchanged
+    resources with a 304 that does not count against the rate limit. Immutable
+    resources (blobs addressed by SHA) are served from the cache without a request.
+    """
+    request = client.build_request("GET", url, headers=headers, params=params)
+    key = _request_key(request)
+    entry = etag_cache.get(key)
+
+    if entry is not None:
+        if immutable:
+            return _cached_response(entry, request)
+        if entry.etag:
+            request.headers["If-None-Match"] = entry.etag
+
+    response = await client.send(request)
+
+    if response.status_code == 304 and entry is not None:
+        return _cached_response(entry, request)
+
+    if response.status_code == 200 and (immutable or "ETag" in response.headers):
+        etag_cache.set(key, CachedBody(
+            etag=response.headers.get("ETag"),
+            link=response.headers.get("Link"),
+            body=response.content
+        ))
+
+    return response
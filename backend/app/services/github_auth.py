@@ -1,102 +1,105 @@
 import httpx
-import os
-from typing import Dict, Any
+from functools import lru_cache
+from urllib.parse import quote, urlencode
+from typing import Dict, Any, Optional
 from fastapi import HTTPException, status
+from app.core.config import get_settings
+from app.services.http import get_github_client, json_body
 
 class GitHubAuthService:
-    def __init__(self):
-        self.client_id = os.getenv("GITHUB_CLIENT_ID")
-        self.client_secret = os.getenv("GITHUB_CLIENT_SECRET")
-        self.redirect_uri = os.getenv("GITHUB_REDIRECT_URI")
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        settings = get_settings()
+        self.client_id = settings.github_client_id
+        self.client_secret = settings.github_client_secret
+        self.redirect_uri = settings.github_redirect_uri
         
         if not all([self.client_id, self.client_secret, self.redirect_uri]):
             raise ValueError("GitHub OAuth credentials not properly configured")
+        
+        self.client = client or get_github_client()
+        
+        # Only the state varies per login, so encode the static part of the query once
+        self._auth_url_prefix = "https://github.com/login/oauth/authorize?" + urlencode({
+            "client_id": self.client_id,
+            "redirect_uri": self.redirect_uri,
+            "scope": "user:email repo"
+        })
 
     def get_authorization_url(self, state: str = None) -> str:
         """Generate GitHub OAuth authorization URL"""
-        base_url = "https://github.com/login/oauth/authorize"
-        params = {
-            "client_id": self.client_id,
-            "redirect_uri": self.redirect_uri,
-            "scope": "user:email repo",
-            "state": state or "random_state_string"
-        }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        return f"{base_url}?{query_string}"
+        return f"{self._auth_url_prefix}&state={quote(state or 'random_state_string')}"
 
     async def exchange_code_for_token(self, code: str) -> str:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                headers={"Accept": "application/json"},
-                data={
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "code": code,
-                    "redirect_uri": self.redirect_uri
-                }
+        response = await self.client.post(
+            "https://github.com/login/oauth/access_token",
+            headers={"Accept": "application/json"},
+            data={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "code": code,
+                "redirect_uri": self.redirect_uri
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to exchange code for token"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Failed to exchange code for token"
-                )
-            
-            data = response.json()
-            if "access_token" not in data:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="No access token received from GitHub"
-                )
-            
-            return data["access_token"]
+        
+        data = json_body(response)
+        if "access_token" not in data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No access token received from GitHub"
+            )
+        
+        return data["access_token"]
 
     async def get_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get user information from GitHub API"""
-        headers = {
-            "Authorization": f"token {access_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+        headers = {"Authorization": f"token {access_token}"}
         
-        async with httpx.AsyncClient() as client:
-            # Get user info
-            user_response = await client.get(
-                "https://api.github.com/user",
-                headers=headers
+        # Get user info
+        user_response = await self.client.get(
+            "/user",
+            headers=headers
+        )
+        
+        if user_response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to fetch user info from GitHub"
             )
-            
-            if user_response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Failed to fetch user info from GitHub"
-                )
-            
-            user_data = user_response.json()
-            
-            # Get user email
-            email_response = await client.get(
-                "https://api.github.com/user/emails",
+        
+        user_data = json_body(user_response)
+        
+        # The public profile email is usually set; only list emails when it is not
+        primary_email = user_data.get("email")
+        if primary_email is None:
+            email_response = await self.client.get(
+                "/user/emails",
                 headers=headers
             )
             
-            primary_email = None
             if email_response.status_code == 200:
-                emails = email_response.json()
-                for email in emails:
-                    if email.get("primary", False):
-                        primary_email = email["email"]
-                        break
-                if not primary_email and emails:
-                    primary_email = emails[0]["email"]
-            
-            return {
-                "id": user_data["id"],
-                "username": user_data["login"],
-                "name": user_data.get("name"),
-                "email": primary_email,
-                "avatar_url": user_data.get("avatar_url"),
-                "github_url": user_data.get("html_url")
-            }
\ No newline at end of file
+                emails = json_body(email_response)
+                primary_email = next(
+                    (email["email"] for email in emails if email.get("primary", False)),
+                    emails[0]["email"] if emails else None
+                )
+        
+        return {
+            "id": user_data["id"],
+            "username": user_data["login"],
+            "name": user_data.get("name"),
+            "email": primary_email,
+            "avatar_url": user_data.get("avatar_url"),
+            "github_url": user_data.get("html_url")
+        }
+
+@lru_cache(maxsize=1)
+def get_github_auth_service() -> GitHubAuthService:
+    """Shared GitHubAuthService instance"""
+    return GitHubAuthService()
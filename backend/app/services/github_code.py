@@ -1,7 +1,12 @@
+import asyncio
+import os
+from collections import Counter
+from functools import lru_cache
 import httpx
-import base64
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import HTTPException
+from app.services.http import get_github_client, json_body
+from app.services.etag_cache import cached_get
 
 class GitHubCodeService:
     """Smart code fetcher with file filtering for cost optimization"""
@@ -21,16 +26,40 @@ class GitHubCodeService:
         'kotlin': ['.kt']
     }
     
-    # Files/directories to skip
-    SKIP_PATTERNS = [
+    # Precomputed lookups so per-file checks are a single C-level endswith/dict hit
+    LANGUAGE_EXTENSIONS = {lang: tuple(exts) for lang, exts in PRIORITY_EXTENSIONS.items()}
+    ALL_CODE_EXTENSIONS = tuple(ext for exts in PRIORITY_EXTENSIONS.values() for ext in exts)
+    EXT_TO_LANG = {ext: lang for lang, exts in PRIORITY_EXTENSIONS.items() for ext in exts}
+    
+    # Non-code files to skip
+    SKIP_EXTENSIONS = (
+        '.md', '.txt', '.json', '.xml', '.yml', '.yaml',
+        '.lock', '.svg', '.png', '.jpg', '.gif', '.ico',
+        '.css', '.scss', '.sass', '.html'
+    )
+    
+    # Directory names to skip (matched exactly against path components)
+    SKIP_PATTERNS = frozenset({
         'node_modules', 'venv', 'env', '__pycache__', '.git', 
         'dist', 'build', 'target', 'vendor', 'public',
         'test', 'tests', '__tests__', 'spec', 'docs',
         '.next', '.nuxt', 'coverage', '.pytest_cache'
-    ]
+    })
+    
+    # Files nested this many directories deep or more are not sampled
+    MAX_DEPTH = 4
+    
+    # Max concurrent GitHub requests per repository fetch
+    FETCH_CONCURRENCY = 10
+    
+    # Blob media type that returns the file body directly
+    RAW_MEDIA_TYPE = "application/vnd.github.v3.raw"
     
-    def __init__(self):
-        self.base_url = "https://api.github.com"
+    # Blobs above this size are rejected from their tree size without fetching (~5000 lines of code)
+    MAX_BYTES = 512 * 1024
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or get_github_client()
         self.max_files = 10  # Limit files to analyze (cost control)
         self.max_file_size = 5000  # Max lines per file
     
@@ -39,7 +68,8 @@ class GitHubCodeService:
         access_token: str, 
         owner: str, 
         repo: str,
-        language: str = None
+        language: str = None,
+        branch: str = "HEAD"
     ) -> Dict[str, Any]:
         """
         Fetch most important code files from repository
@@ -47,141 +77,177 @@ class GitHubCodeService:
         Returns:
             Dict with files and metadata
         """
-        headers = {
-            "Authorization": f"token {access_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+        headers = {"Authorization": f"token {access_token}"}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                # Get repository contents
-                repo_url = f"{self.base_url}/repos/{owner}/{repo}/contents"
-                response = await client.get(repo_url, headers=headers)
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Failed to fetch repository contents"
-                    )
-                
-                contents = response.json()
-                
-                # Find and prioritize code files
-                code_files = await self._get_priority_files(
-                    client, headers, owner, repo, contents, language
-                )
-                
-                return {
-                    "files": code_files,
-                    "language": language or self._detect_primary_language(code_files),
-                    "total_files": len(code_files),
-                    "total_lines": sum(f["lines"] for f in code_files)
-                }
-                
+            # List every file in the repository with a single request
+            tree = await self._list_tree(self.client, headers, owner, repo, branch)
+            
+            # Find and prioritize code files
+            code_files = await self._get_priority_files(
+                self.client, headers, tree, language
+            )
+            
+            return {
+                "files": code_files,
+                "language": language or self._detect_primary_language(code_files),
+                "total_files": len(code_files),
+                "total_lines": sum(f["lines"] for f in code_files)
+            }
+            
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error fetching code: {str(e)}"
             )
     
-    async def _get_priority_files(
+    async def _list_tree(
+        self,
+        client: httpx.AsyncClient,
+        headers: dict,
+        owner: str,
+        repo: str,
+        branch: str
+    ) -> List[dict]:
+        """List all files (blobs) in the repository via the recursive Git Trees API"""
+        response = await cached_get(
+            client,
+            f"/repos/{owner}/{repo}/git/trees/{branch}",
+            headers=headers,
+            params={"recursive": "1"}
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to fetch repository contents"
+            )
+        
+        body = json_body(response)
+        if body.get("truncated"):
+            # Past GitHub's recursive listing limit the tree is cut off arbitrarily;
+            # walk it one level per request instead, skipping what wouldn't be sampled
+            print(f"⚠️  Tree for {owner}/{repo} truncated, walking subtrees")
+            return await self._walk_tree(client, headers, owner, repo, branch)
+        
+        return [entry for entry in body["tree"] if entry["type"] == "blob"]
+    
+    async def _walk_tree(
         self,
         client: httpx.AsyncClient,
         headers: dict,
         owner: str,
         repo: str,
-        contents: List[dict],
+        sha: str,
+        prefix: str = "",
+        depth: int = 0
+    ) -> List[dict]:
+        """List blobs under one tree with non-recursive requests, stopping at MAX_DEPTH and SKIP_PATTERNS"""
+        response = await cached_get(
+            client,
+            f"/repos/{owner}/{repo}/git/trees/{sha}",
+            headers=headers
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to fetch repository contents"
+            )
+        
+        blobs = []
+        subtrees = []
+        for entry in json_body(response)["tree"]:
+            path = prefix + entry["path"]
+            if entry["type"] == "blob":
+                blobs.append({**entry, "path": path})
+            elif entry["type"] == "tree" and depth + 1 < self.MAX_DEPTH and entry["path"] not in self.SKIP_PATTERNS:
+                subtrees.append(self._walk_tree(
+                    client, headers, owner, repo, entry["sha"], f"{path}/", depth + 1
+                ))
+        
+        for subtree_blobs in await asyncio.gather(*subtrees):
+            blobs.extend(subtree_blobs)
+        return blobs
+    
+    async def _get_priority_files(
+        self,
+        client: httpx.AsyncClient,
+        headers: dict,
+        tree: List[dict],
         language: str = None
     ) -> List[Dict[str, Any]]:
         """Get most important files based on smart filtering"""
-        priority_files = []
-        
-        for item in contents:
-            # Skip directories and files we don't want
-            if item["type"] == "dir":
-                if not any(skip in item["name"] for skip in self.SKIP_PATTERNS):
-                    # Recursively check directory (limited depth)
-                    dir_contents = await self._fetch_directory_contents(
-                        client, headers, item["url"]
-                    )
-                    if dir_contents:
-                        sub_files = await self._get_priority_files(
-                            client, headers, owner, repo, dir_contents, language
-                        )
-                        priority_files.extend(sub_files)
+        # Filter the listing locally, no network calls
+        candidates = []
+        for entry in tree:
+            directories = entry["path"].split("/")[:-1]
+            if len(directories) >= self.MAX_DEPTH or not self.SKIP_PATTERNS.isdisjoint(directories):
                 continue
-            
-            # Check if file is worth analyzing
-            if not self._should_analyze_file(item["name"], language):
+            # Tree entries carry the blob size, so skip empty and oversize files unfetched
+            size = entry.get("size", 0)
+            if size == 0 or size > self.MAX_BYTES:
                 continue
+            if self._should_analyze_file(entry["path"], language):
+                # Entry-point files (main/index) rank first; computed once per file
+                path_lower = entry["path"].lower()
+                priority = 0 if 'main' in path_lower or 'index' in path_lower else 1
+                candidates.append((priority, entry))
+        
+        # Most promising first (main files, then larger files) so we fetch as few as possible
+        candidates.sort(key=lambda x: (x[0], -x[1]['size']))
+        
+        semaphore = asyncio.Semaphore(self.FETCH_CONCURRENCY)
+        
+        async def fetch_file(entry: dict) -> Optional[bytes]:
+            async with semaphore:
+                return await self._fetch_file_content(client, headers, entry["url"])
+        
+        # Fetch in waves of max_files until enough files pass the size check
+        priority_files = []
+        for start in range(0, len(candidates), self.max_files):
+            batch = candidates[start:start + self.max_files]
+            file_contents = await asyncio.gather(*[fetch_file(entry) for _, entry in batch])
             
-            # Fetch file content
-            try:
-                file_content = await self._fetch_file_content(
-                    client, headers, item["url"]
-                )
+            for (priority, entry), raw_content in zip(batch, file_contents):
+                if not raw_content:
+                    continue
                 
-                if file_content:
-                    lines = file_content.count('\n') + 1
-                    
-                    # Skip very large files
-                    if lines > self.max_file_size:
-                        continue
-                    
-                    priority_files.append({
-                        "path": item["path"],
-                        "content": file_content,
-                        "lines": lines,
-                        "size": item["size"]
-                    })
-                    
-                    # Stop if we have enough files
-                    if len(priority_files) >= self.max_files:
-                        break
-                        
-            except Exception as e:
-                print(f"Error fetching {item['name']}: {e}")
-                continue
+                lines = raw_content.count(b'\n') + 1
+                
+                # Skip very large files before paying for the decode
+                if lines > self.max_file_size:
+                    continue
+                
+                priority_files.append((priority, {
+                    "path": entry["path"],
+                    "content": raw_content.decode('utf-8', errors='replace'),
+                    "lines": lines,
+                    "size": entry["size"]
+                }))
+            
+            if len(priority_files) >= self.max_files:
+                break
         
         # Sort by importance (main files first, then by size)
-        priority_files.sort(
-            key=lambda x: (
-                'main' not in x['path'].lower() and 'index' not in x['path'].lower(),
-                -x['lines']
-            )
-        )
+        priority_files.sort(key=lambda x: (x[0], -x[1]['lines']))
         
-        return priority_files[:self.max_files]
-    
-    async def _fetch_directory_contents(
-        self,
-        client: httpx.AsyncClient,
-        headers: dict,
-        url: str
-    ) -> List[dict]:
-        """Fetch directory contents"""
-        try:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json()
-        except:
-            pass
-        return []
+        return [file for _, file in priority_files[:self.max_files]]
     
     async def _fetch_file_content(
         self,
         client: httpx.AsyncClient,
         headers: dict,
         url: str
-    ) -> str:
-        """Fetch and decode file content"""
+    ) -> Optional[bytes]:
+        """Fetch a blob's raw bytes (no JSON envelope or base64 to decode)"""
         try:
-            response = await client.get(url, headers=headers)
+            # Blobs are addressed by SHA, so a cached copy never goes stale
+            response = await cached_get(
+                client, url, {**headers, "Accept": self.RAW_MEDIA_TYPE}, immutable=True
+            )
             if response.status_code == 200:
-                data = response.json()
-                if data.get("encoding") == "base64":
-                    content = base64.b64decode(data["content"]).decode('utf-8')
-                    return content
+                return response.content
         except:
             pass
         return None
@@ -189,34 +255,29 @@ class GitHubCodeService:
     def _should_analyze_file(self, filename: str, language: str = None) -> bool:
         """Determine if file should be analyzed"""
         # Skip non-code files
-        skip_extensions = [
-            '.md', '.txt', '.json', '.xml', '.yml', '.yaml',
-            '.lock', '.svg', '.png', '.jpg', '.gif', '.ico',
-            '.css', '.scss', '.sass', '.html'
-        ]
-        
-        if any(filename.endswith(ext) for ext in skip_extensions):
+        if filename.endswith(self.SKIP_EXTENSIONS):
             return False
         
         # If language specified, check for matching extension
         if language:
-            extensions = self.PRIORITY_EXTENSIONS.get(language.lower(), [])
-            return any(filename.endswith(ext) for ext in extensions)
+            return filename.endswith(self.LANGUAGE_EXTENSIONS.get(language.lower(), ()))
         
         # Accept any code file
-        all_extensions = [ext for exts in self.PRIORITY_EXTENSIONS.values() for ext in exts]
-        return any(filename.endswith(ext) for ext in all_extensions)
+        return filename.endswith(self.ALL_CODE_EXTENSIONS)
     
     def _detect_primary_language(self, files: List[Dict[str, Any]]) -> str:
         """Detect primary language from file extensions"""
-        extension_count = {}
-        
-        for file in files:
-            for lang, extensions in self.PRIORITY_EXTENSIONS.items():
-                if any(file["path"].endswith(ext) for ext in extensions):
-                    extension_count[lang] = extension_count.get(lang, 0) + 1
+        language_count = Counter(
+            self.EXT_TO_LANG.get(os.path.splitext(file["path"])[1]) for file in files
+        )
+        language_count.pop(None, None)
         
-        if extension_count:
-            return max(extension_count, key=extension_count.get)
+        if language_count:
+            return language_count.most_common(1)[0][0]
         
-        return "unknown"
\ No newline at end of file
+        return "unknown"
+
+@lru_cache(maxsize=1)
+def get_github_code_service() -> GitHubCodeService:
+    """Shared GitHubCodeService instance"""
+    return GitHubCodeService()
@@ -1,85 +1,104 @@
+import asyncio
 import httpx
-from typing import List, Dict, Any
+from functools import lru_cache
+from operator import itemgetter
+from urllib.parse import parse_qs, urlparse
+from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
+from app.services.http import get_github_client, json_body
+from app.services.etag_cache import cached_get
+
+# Required GitHub repository fields and the column names they map to
+_REPO_GETTER = itemgetter(
+    "id", "name", "full_name", "url", "html_url", "private", "fork",
+    "stargazers_count", "forks_count", "open_issues_count", "size"
+)
+_REPO_KEYS = (
+    "github_id", "name", "full_name", "url", "html_url", "is_private", "is_fork",
+    "stars_count", "forks_count", "open_issues_count", "size"
+)
 
 class GitHubRepoService:
     """Service for interacting with GitHub Repository API"""
     
-    def __init__(self):
-        self.base_url = "https://api.github.com"
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or get_github_client()
     
     async def fetch_user_repositories(self, access_token: str) -> List[Dict[str, Any]]:
         """Fetch all repositories for the authenticated user"""
-        headers = {
-            "Authorization": f"token {access_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+        headers = {"Authorization": f"token {access_token}"}
         
-        all_repos = []
-        page = 1
         per_page = 100  # Maximum allowed by GitHub API
+        params = {
+            "per_page": per_page,
+            "sort": "updated",
+            "affiliation": "owner,collaborator,organization_member"
+        }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            while True:
-                try:
-                    response = await client.get(
-                        f"{self.base_url}/user/repos",
-                        headers=headers,
-                        params={
-                            "per_page": per_page,
-                            "page": page,
-                            "sort": "updated",
-                            "affiliation": "owner,collaborator,organization_member"
-                        }
-                    )
-                    
-                    if response.status_code != 200:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"Failed to fetch repositories from GitHub: {response.text}"
-                        )
-                    
-                    repos = response.json()
-                    
-                    if not repos:
-                        break
-                    
-                    all_repos.extend(repos)
-                    
-                    # If we got fewer repos than per_page, we've reached the end
-                    if len(repos) < per_page:
-                        break
-                    
-                    page += 1
-                    
-                except httpx.TimeoutException:
-                    raise HTTPException(
-                        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-                        detail="GitHub API request timed out"
-                    )
-                except Exception as e:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Error fetching repositories: {str(e)}"
-                    )
+        try:
+            response = await self._fetch_page(headers, params, 1)
+            repos = json_body(response)
+            all_repos = list(repos)
+            
+            # GitHub advertises the total page count in the Link header, so fetch the rest at once
+            last_url = response.links.get("last", {}).get("url")
+            if last_url:
+                last_page = int(parse_qs(urlparse(last_url).query)["page"][0])
+                responses = await asyncio.gather(
+                    *[self._fetch_page(headers, params, page) for page in range(2, last_page + 1)]
+                )
+                for page_response in responses:
+                    all_repos.extend(json_body(page_response))
+                return all_repos
+            
+            # No Link header: page sequentially until a short page
+            page = 1
+            while len(repos) == per_page:
+                page += 1
+                repos = json_body(await self._fetch_page(headers, params, page))
+                all_repos.extend(repos)
+            
+            return all_repos
+            
+        except HTTPException as e:
+            raise e
+        except httpx.TimeoutException:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="GitHub API request timed out"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error fetching repositories: {str(e)}"
+            )
+    
+    async def _fetch_page(self, headers: dict, params: dict, page: int) -> httpx.Response:
+        """Fetch one page of the user's repositories"""
+        response = await cached_get(
+            self.client,
+            "/user/repos",
+            headers=headers,
+            params={**params, "page": page}
+        )
         
-        return all_repos
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to fetch repositories from GitHub: {response.text}"
+            )
+        
+        return response
     
     def parse_repository_data(self, repo_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse GitHub repository data into our format"""
-        return {
-            "github_id": repo_data["id"],
-            "name": repo_data["name"],
-            "full_name": repo_data["full_name"],
+        return dict(zip(_REPO_KEYS, _REPO_GETTER(repo_data))) | {
             "description": repo_data.get("description"),
-            "url": repo_data["url"],
-            "html_url": repo_data["html_url"],
             "default_branch": repo_data.get("default_branch", "main"),
             "language": repo_data.get("language"),
-            "is_private": repo_data["private"],
-            "is_fork": repo_data["fork"],
-            "stars_count": repo_data["stargazers_count"],
-            "forks_count": repo_data["forks_count"],
-            "open_issues_count": repo_data["open_issues_count"],
-            "size": repo_data["size"],
-        }
\ No newline at end of file
+        }
+
+@lru_cache(maxsize=1)
+def get_github_repo_service() -> GitHubRepoService:
+    """Shared GitHubRepoService instance"""
+    return GitHubRepoService()
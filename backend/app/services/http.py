@@ -0,0 +1,27 @@
+import httpx
+import orjson
+from functools import lru_cache
+from typing import Any
+
+GITHUB_API_URL = "https://api.github.com"
+
+@lru_cache(maxsize=1)
+def get_github_client() -> httpx.AsyncClient:
+    """Shared GitHub client so every call reuses pooled HTTP/2 connections"""
+    return httpx.AsyncClient(
+        base_url=GITHUB_API_URL,
+        headers={"Accept": "application/vnd.github.v3+json"},
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    )
+
+def json_body(response: httpx.Response) -> Any:
+    """Decode a JSON response body with orjson (much faster than httpx's stdlib json)"""
+    return orjson.loads(response.content)
+
+async def close_github_client() -> None:
+    """Close the shared client (called on application shutdown)"""
+    if get_github_client.cache_info().currsize:
+        await get_github_client().aclose()
+        get_github_client.cache_clear()
@@ -6,10 +6,6 @@ This will show you exactly what's in your database
 """
 import os
 import sys
-from dotenv import load_dotenv
-
-# Load environment
-load_dotenv("../.env")
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -23,38 +19,49 @@ print("=" * 60)
 
 engine = create_engine(DATABASE_URL)
 
+# Stream rows with a server-side cursor so memory stays flat however large the tables are
+BATCH_SIZE = 1000
+
 with engine.connect() as conn:
+    stream = conn.execution_options(stream_results=True)
+    
     print("\n📊 USERS TABLE:")
     print("-" * 60)
-    users = conn.execute(text("SELECT id, username, github_id FROM users")).fetchall()
-    for user in users:
+    users = stream.execute(text("SELECT id, username, github_id FROM users"))
+    for user in users.yield_per(BATCH_SIZE):
         print(f"  ID: {user[0]}, Username: {user[1]}, GitHub ID: {user[2]}")
     
     print("\n📦 REPOSITORIES TABLE:")
     print("-" * 60)
-    repos = conn.execute(text("""
+    repos = stream.execute(text("""
         SELECT r.id, r.full_name, r.user_id, u.username 
         FROM repositories r 
         LEFT JOIN users u ON r.user_id = u.id
-    """)).fetchall()
+    """))
     
-    for repo in repos:
+    for repo in repos.yield_per(BATCH_SIZE):
         print(f"  Repo ID: {repo[0]}, Name: {repo[1]}, Owner User ID: {repo[2]}, Owner Username: {repo[3]}")
     
     print("\n🔍 ISSUE DETECTION:")
     print("-" * 60)
     
-    # Check for orphaned repos (user_id doesn't exist)
-    orphaned = conn.execute(text("""
-        SELECT r.id, r.full_name, r.user_id 
+    # Count orphaned repos (user_id doesn't exist) in SQL before listing any
+    total_repos, orphaned_count = conn.execute(text("""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE u.id IS NULL)
         FROM repositories r 
         LEFT JOIN users u ON r.user_id = u.id
-        WHERE u.id IS NULL
-    """)).fetchall()
+    """)).one()
+    print(f"  {total_repos} repositories, {orphaned_count} orphaned")
     
-    if orphaned:
+    if orphaned_count:
+        orphaned = stream.execute(text("""
+            SELECT r.id, r.full_name, r.user_id 
+            FROM repositories r 
+            LEFT JOIN users u ON r.user_id = u.id
+            WHERE u.id IS NULL
+        """))
         print("  ⚠️  FOUND ORPHANED REPOSITORIES (no matching user):")
-        for repo in orphaned:
+        for repo in orphaned.yield_per(BATCH_SIZE):
             print(f"     Repo ID: {repo[0]}, Name: {repo[1]}, Invalid User ID: {repo[2]}")
     else:
         print("  ✅ No orphaned repositories found")
@@ -62,14 +69,14 @@ with engine.connect() as conn:
     # Check which repositories belong to which user
     print("\n📋 REPOSITORY OWNERSHIP:")
     print("-" * 60)
-    ownership = conn.execute(text("""
+    ownership = stream.execute(text("""
         SELECT u.id, u.username, COUNT(r.id) as repo_count
         FROM users u
         LEFT JOIN repositories r ON u.id = r.user_id
         GROUP BY u.id, u.username
-    """)).fetchall()
+    """))
     
-    for owner in ownership:
+    for owner in ownership.yield_per(BATCH_SIZE):
         print(f"  User {owner[0]} ({owner[1]}): owns {owner[2]} repositories")
 
 print("\n" + "=" * 60)
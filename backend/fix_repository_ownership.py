@@ -6,10 +6,6 @@ This will ask for your username and update all repos to belong to you
 """
 import os
 import sys
-from dotenv import load_dotenv
-
-# Load environment
-load_dotenv("../.env")
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -23,29 +19,37 @@ print("=" * 60)
 
 engine = create_engine(DATABASE_URL)
 
-with engine.connect() as conn:
+# The whole fix runs in one transaction (committed when the block exits)
+with engine.begin() as conn:
+    # Users and current repository ownership in a single round trip
+    rows = conn.execute(text("""
+        SELECT 'user' AS kind, id, username AS name, NULL::integer AS user_id, NULL AS owner
+        FROM users
+        UNION ALL
+        SELECT 'repo', r.id, r.full_name, r.user_id, u.username
+        FROM repositories r
+        LEFT JOIN users u ON r.user_id = u.id
+        ORDER BY kind DESC, id
+    """)).fetchall()
+    
+    users = {row.id: row.name for row in rows if row.kind == 'user'}
+    repos = [row for row in rows if row.kind == 'repo']
+    
     # Show all users
     print("\n📊 Available Users:")
-    users = conn.execute(text("SELECT id, username FROM users")).fetchall()
     
     if not users:
         print("  ❌ No users found! Please login first.")
         sys.exit(1)
     
-    for user in users:
-        print(f"  {user[0]}. {user[1]}")
+    for user_id, username in users.items():
+        print(f"  {user_id}. {username}")
     
     # Show current repository ownership
     print("\n📦 Current Repository Ownership:")
-    repos = conn.execute(text("""
-        SELECT r.id, r.full_name, r.user_id, u.username 
-        FROM repositories r 
-        LEFT JOIN users u ON r.user_id = u.id
-    """)).fetchall()
-    
     for repo in repos:
-        owner = repo[3] if repo[3] else "ORPHANED"
-        print(f"  Repo {repo[0]}: {repo[1]} → Owner: {owner} (ID: {repo[2]})")
+        owner = repo.owner if repo.owner else "ORPHANED"
+        print(f"  Repo {repo.id}: {repo.name} → Owner: {owner} (ID: {repo.user_id})")
     
     # Ask user which ID to use
     print("\n" + "=" * 60)
@@ -58,34 +62,25 @@ with engine.connect() as conn:
         
         user_id = int(user_id)
         
-        # Verify user exists
-        user = conn.execute(text("SELECT username FROM users WHERE id = :id"), {"id": user_id}).fetchone()
-        
-        if not user:
+        # Verify user exists (already loaded above)
+        if user_id not in users:
             print(f"❌ User ID {user_id} not found!")
             sys.exit(1)
         
-        print(f"\n🔄 Updating all repositories to belong to: {user[0]} (ID: {user_id})")
+        print(f"\n🔄 Updating all repositories to belong to: {users[user_id]} (ID: {user_id})")
         
-        # Update all repositories
-        result = conn.execute(
-            text("UPDATE repositories SET user_id = :user_id"),
+        # Update all repositories; RETURNING gives the final state without re-selecting
+        updated = conn.execute(
+            text("UPDATE repositories SET user_id = :user_id RETURNING id, full_name"),
             {"user_id": user_id}
-        )
-        conn.commit()
+        ).fetchall()
         
-        print(f"✅ Successfully updated {result.rowcount} repositories!")
+        print(f"✅ Successfully updated {len(updated)} repositories!")
         
         # Show final state
         print("\n📦 Updated Repository Ownership:")
-        repos = conn.execute(text("""
-            SELECT r.id, r.full_name, u.username 
-            FROM repositories r 
-            JOIN users u ON r.user_id = u.id
-        """)).fetchall()
-        
-        for repo in repos:
-            print(f"  Repo {repo[0]}: {repo[1]} → Owner: {repo[2]}")
+        for repo in sorted(updated):
+            print(f"  Repo {repo.id}: {repo.full_name} → Owner: {users[user_id]}")
         
         print("\n✨ Done! Try analyzing a repository now.")
         
@@ -94,4 +89,4 @@ with engine.connect() as conn:
         sys.exit(1)
     except KeyboardInterrupt:
         print("\n\nCancelled.")
-        sys.exit(0)
\ No newline at end of file
+        sys.exit(0)
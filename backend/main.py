@@ -1,49 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv("../.env")
 
+from app.core.config import get_settings
 from app.api.v1.router import router as api_v1_router
-from app.core.database import engine, Base
-
-# Import models to register them with SQLAlchemy
-from app.models.user import User
-from app.models.repository import Repository
-from app.models.analysis import Analysis, CodeIssue
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="CodeCritic AI API",
-    description="AI-powered code review and analysis platform",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include API routes
-app.include_router(api_v1_router, prefix="/api/v1")
-
-@app.get("/")
+from app.core.cache import close_cache
+from app.services.http import close_github_client
+from app.services.openai_service import close_openai_service, get_openai_service
+from app.core.orjson_response import ORJSONResponse
+
+def run_migrations():
+    """Apply pending Alembic migrations (schema changes normally run as a deploy step)"""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dev convenience: set AUTO_MIGRATE=true to migrate on startup (every worker runs it;
+    # an advisory lock in alembic/env.py lets only the first one apply migrations)
+    if get_settings().auto_migrate:
+        run_migrations()
+    
+    # Build the OpenAI service (and load its tokenizer) off the event loop before serving
+    try:
+        await asyncio.to_thread(get_openai_service)
+    except ValueError as e:
+        print(f"⚠️  OpenAI service unavailable: {e}")
+    yield
+    await close_github_client()
+    await close_openai_service()
+    await close_cache()
+
 async def root():
     return {"message": "CodeCritic AI API is running!", "status": "healthy"}
 
-@app.get("/health")
 async def health_check():
     return {
         "status": "healthy", 
@@ -51,12 +48,50 @@ async def health_check():
         "version": "1.0.0"
     }
 
+def create_app() -> FastAPI:
+    """Build the API application (the single place its middleware and routes are set up)"""
+    app = FastAPI(
+        title="CodeCritic AI API",
+        description="AI-powered code review and analysis platform",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=get_settings().cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Include API routes
+    app.include_router(api_v1_router, prefix="/api/v1")
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/health", health_check, methods=["GET"])
+    
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    
+    settings = get_settings()
+    
+    if settings.env == "dev":
+        # Auto-reload needs a single process
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_level="info")
+    else:
+        # uvloop and httptools ship with uvicorn[standard]
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            workers=settings.web_concurrency,
+            log_level="info"
+        )
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Poll OpenAI Batch Analyses
+Run: python poll_batch_analyses.py  (e.g. from cron every few minutes)
+
+Stores results for analyses queued through POST /api/v1/analysis/batch
+once their OpenAI batch has completed
+"""
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.core.cache import close_cache
+from app.core.database import SessionLocal, register_models
+from app.crud import crud_analysis
+from app.services.analysis_service import AnalysisService
+from app.services.github_code import get_github_code_service
+from app.services.openai_service import close_openai_service, get_openai_service
+from app.services.http import close_github_client
+
+async def main():
+    register_models()
+    service = AnalysisService(get_github_code_service(), get_openai_service())
+    db = SessionLocal()
+    try:
+        batch_ids = crud_analysis.get_pending_batch_ids(db)
+        print(f"📦 {len(batch_ids)} pending batch(es)")
+        
+        for batch_id in batch_ids:
+            updated = await service.apply_batch_results(db, batch_id)
+            if updated:
+                print(f"  ✅ {batch_id}: stored {updated} analyses")
+            else:
+                print(f"  ⏳ {batch_id}: still running")
+    finally:
+        db.close()
+        await close_github_client()
+        await close_openai_service()
+        await close_cache()
+
+print("=" * 60)
+print("POLLING BATCH ANALYSES")
+print("=" * 60)
+
+asyncio.run(main())
+
+print("\n✨ Done!")
@@ -3,15 +3,20 @@ Test if OpenAI and other configurations are set up correctly
 Run: python test_config.py
 """
 import os
-from dotenv import load_dotenv
+import sys
 
-# Load from parent directory .env
-load_dotenv("../.env")
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.core.config import Settings, get_settings
+
+# Loads the parent directory .env
+settings = get_settings()
 
 print("🔍 Checking Configuration...\n")
 
 # Check OpenAI Key
-openai_key = os.getenv("OPENAI_API_KEY")
+openai_key = settings.openai_api_key
 if openai_key:
     print(f"✅ OPENAI_API_KEY: {openai_key[:10]}...{openai_key[-4:]}")
 else:
@@ -19,8 +24,8 @@ else:
     print("   Add to .env: OPENAI_API_KEY=sk-your-key-here")
 
 # Check GitHub Keys
-github_client_id = os.getenv("GITHUB_CLIENT_ID")
-github_client_secret = os.getenv("GITHUB_CLIENT_SECRET")
+github_client_id = settings.github_client_id
+github_client_secret = settings.github_client_secret
 
 if github_client_id:
     print(f"✅ GITHUB_CLIENT_ID: {github_client_id[:10]}...")
@@ -33,15 +38,16 @@ else:
     print("❌ GITHUB_CLIENT_SECRET: NOT FOUND")
 
 # Check Database
-db_url = os.getenv("DATABASE_URL")
+db_url = settings.database_url
 if db_url:
     print(f"✅ DATABASE_URL: {db_url[:30]}...")
 else:
     print("❌ DATABASE_URL: NOT FOUND")
 
 # Check JWT Secret
-jwt_secret = os.getenv("JWT_SECRET_KEY")
-if jwt_secret:
+# Settings fall back to a placeholder secret, which does not count as configured
+jwt_secret = settings.jwt_secret_key
+if jwt_secret != Settings.model_fields["jwt_secret_key"].default:
     print(f"✅ JWT_SECRET_KEY: {jwt_secret[:10]}...")
 else:
     print("❌ JWT_SECRET_KEY: NOT FOUND")
@@ -3,13 +3,16 @@ Detailed OpenAI connection test
 Run: python test_openai.py
 """
 import os
-from dotenv import load_dotenv
+import sys
 
-load_dotenv("../.env")
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.core.config import get_settings
 
 print("🔍 Testing OpenAI API Connection...\n")
 
-openai_key = os.getenv("OPENAI_API_KEY")
+openai_key = get_settings().openai_api_key
 
 if not openai_key:
     print("❌ OPENAI_API_KEY not found in .env")
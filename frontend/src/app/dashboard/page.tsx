@@ -3,7 +3,7 @@
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/contexts/AuthContext';
-import { syncRepositories, listRepositories, getRepositoryStats, startAnalysis } from '@/lib/api';
+import { syncRepositories, listRepositories, getRepositoryStats, streamAnalysis } from '@/lib/api';
 import { Github, Code, Star, GitFork, RefreshCw, ExternalLink } from 'lucide-react';
 
 interface Repository {
@@ -36,6 +36,8 @@ export default function DashboardPage() {
   const [syncing, setSyncing] = useState(false);
   const [loading, setLoading] = useState(true);
   const [analyzingRepos, setAnalyzingRepos] = useState<Set<number>>(new Set());
+  // Characters of model output received so far, per repository being analyzed
+  const [analysisProgress, setAnalysisProgress] = useState<Record<number, number>>({});
 
   useEffect(() => {
     if (!authLoading && !user) {
@@ -90,7 +92,11 @@ export default function DashboardPage() {
     try {
       setAnalyzingRepos(prev => new Set(prev).add(repoId));
       
-      const result = await startAnalysis(repoId);
+      const result = await streamAnalysis(repoId, (event) => {
+        if (event.type === 'delta') {
+          setAnalysisProgress(prev => ({ ...prev, [repoId]: (prev[repoId] || 0) + event.content.length }));
+        }
+      });
       
       if (result.status === 'completed') {
         // Navigate to results page
@@ -103,7 +109,7 @@ export default function DashboardPage() {
       }
     } catch (error: any) {
       console.error('Failed to start analysis:', error);
-      const errorMessage = error.response?.data?.detail || 'Failed to start analysis';
+      const errorMessage = error.message || 'Failed to start analysis';
       alert(`❌ Error: ${errorMessage}`);
     } finally {
       setAnalyzingRepos(prev => {
@@ -111,6 +117,10 @@ export default function DashboardPage() {
         newSet.delete(repoId);
         return newSet;
       });
+      setAnalysisProgress(prev => {
+        const { [repoId]: _, ...rest } = prev;
+        return rest;
+      });
     }
   };
 
@@ -268,7 +278,9 @@ export default function DashboardPage() {
                         disabled={analyzingRepos.has(repo.id)}
                         className="ml-4 bg-green-500 hover:bg-green-700 text-white font-bold py-2 px-4 rounded disabled:opacity-50 disabled:cursor-not-allowed"
                       >
-                        {analyzingRepos.has(repo.id) ? 'Analyzing...' : 'Analyze'}
+                        {analyzingRepos.has(repo.id)
+                          ? `Analyzing...${analysisProgress[repo.id] ? ` (${analysisProgress[repo.id]} chars)` : ''}`
+                          : 'Analyze'}
                       </button>
                     </div>
                   </div>
@@ -81,6 +81,53 @@ export const startAnalysis = async (repositoryId: number) => {
   return response.data;
 };
 
+export type AnalysisStreamEvent =
+  | { type: 'delta'; content: string }
+  | { type: 'done'; analysis_id: number; status: string }
+  | { type: 'error'; detail: string };
+
+// Streams model output as Server-Sent Events over a POST. EventSource can't send the
+// bearer token, so the body is read with fetch() and split on blank lines.
+export const streamAnalysis = async (
+  repositoryId: number,
+  onEvent?: (event: AnalysisStreamEvent) => void
+): Promise<{ analysis_id: number; status: string }> => {
+  const token = getAuthToken();
+  const response = await fetch(`${API_BASE_URL}/api/v1/analysis/analyze/${repositoryId}/stream`, {
+    method: 'POST',
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+
+  if (!response.ok || !response.body) {
+    const body = await response.json().catch(() => ({}));
+    throw new Error(body.detail || 'Failed to start analysis');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      if (!frame.startsWith('data: ')) continue;
+
+      const event: AnalysisStreamEvent = JSON.parse(frame.slice(6));
+      onEvent?.(event);
+      if (event.type === 'done') return { analysis_id: event.analysis_id, status: event.status };
+      if (event.type === 'error') throw new Error(event.detail);
+    }
+  }
+
+  throw new Error('Analysis stream ended unexpectedly');
+};
+
 export const listAnalyses = async (skip: number = 0, limit: number = 50) => {
   const response = await api.get('/api/v1/analysis/list', {
     params: { skip, limit }